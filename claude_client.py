@@ -1,9 +1,15 @@
 # claude_client.py
 # Responsibility: send a prompt to the Claude API and return the raw response text.
-# This module knows nothing about sports, HTML, or files.
-# It has one job: talk to Claude.
+# This module knows nothing about sports or HTML.
+# It has one job: talk to Claude (and, optionally, remember what Claude said).
 
+import asyncio
+import hashlib  # standard library — SHA-256 hashing for cache keys
+import json
+import math
 import os
+import random
+import time
 from dotenv import load_dotenv
 import anthropic  # the official Anthropic Python SDK
 
@@ -12,64 +18,142 @@ import anthropic  # the official Anthropic Python SDK
 # it's idempotent (calling it again has no effect if already loaded).
 load_dotenv()
 
+# The shared Anthropic clients, created on first use by _get_client() and
+# _get_async_client(). Creating a client builds an HTTP connection pool and
+# TLS context, so we keep one around and reuse it — the second call in a
+# "both" run then rides on the already-open connection instead of
+# handshaking again.
+_client = None
+_async_client = None
 
-def generate_story(prompt: str) -> str:
-    """
-    Sends a prompt to Claude and returns the generated text response.
+# --- Response cache configuration ---
+# During development you often re-run the pipeline against the same match,
+# which sends Claude a byte-for-byte identical prompt. With LLM_CACHE_ENABLE=1
+# we store each response on disk, keyed by a hash of the request, and reuse it
+# for LLM_CACHE_TTL seconds (default 30 minutes) — no API call, no tokens.
+# This is only safe because our prompt fully determines the story we want;
+# it's off by default so production runs always get a fresh generation.
+_CACHE_DIR = os.path.join(os.path.dirname(__file__), "output", ".llm_cache")
+_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLE") == "1"
 
-    Args:
-        prompt: The complete prompt string from prompt_builder.build_prompt()
+# A malformed LLM_CACHE_TTL falls back to the default rather than crashing
+# the import of this module (and with it main.py), even with the cache off.
+try:
+    _CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "1800"))
+except ValueError:
+    _CACHE_TTL = 1800.0
 
-    Returns:
-        Claude's raw response as a string (should be a JSON object).
+# --- Streaming configuration ---
+# By default we stream Claude's response: tokens arrive as they're generated,
+# we print a progress dot per chunk (or one labelled line, when several
+# requests run at once), and you see the first output within a second
+# instead of staring at a silent terminal until the whole JSON is
+# done. LLM_STREAM=0 switches back to a single blocking request, which is
+# marginally cheaper when you don't care about progress output.
+_STREAM = os.getenv("LLM_STREAM", "1") != "0"
+
+# --- Retry configuration ---
+# Rate limits (429), server errors (5xx) and Anthropic's "overloaded" (529)
+# are usually transient — the same request succeeds a moment later. Rather
+# than failing the whole team, we try up to _MAX_ATTEMPTS times, waiting
+# 1s, 2s, 4s... (plus random jitter, so concurrent calls don't retry in
+# lockstep) between attempts. If the server sends a Retry-After header we
+# wait that long instead — but never more than _MAX_RETRY_AFTER seconds, so
+# a long Retry-After can't stall the CLI for minutes. Errors like 400 or 401
+# won't fix themselves, so those are raised immediately.
+_MAX_ATTEMPTS = 3
+_MAX_RETRY_AFTER = 30  # seconds
+_RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+
+
+def _get_api_key() -> str:
+    """
+    Retrieves the API key from the environment.
+
+    We validate it here rather than letting the SDK throw a cryptic error.
 
     Raises:
         ValueError: If the API key is missing.
-        anthropic.APIError: If the API call fails.
     """
-
-    # Step 1: Retrieve the API key from the environment.
-    # We validate it here rather than letting the SDK throw a cryptic error.
     api_key = os.getenv("ANTHROPIC_API_KEY")
     if not api_key:
         raise ValueError(
             "ANTHROPIC_API_KEY not found. "
             "Check your .env file is present and correctly formatted."
         )
+    return api_key
 
-    # Step 2: Instantiate the Anthropic client.
-    # The SDK reads the api_key and handles authentication for every
-    # subsequent request. We create it fresh per call here for simplicity.
-    # In a production web server you'd create it once at startup and reuse it.
-    client = anthropic.Anthropic(api_key=api_key)
 
-    # Step 3: Split our prompt into system and user parts.
-    # Our prompt from prompt_builder is one big string. We're going to
-    # send the first paragraph (the persona) as the system prompt, and
-    # the rest (match data + task + format) as the user message.
-    #
-    # We do this by splitting on the first double-newline after the persona.
-    # The persona is always the first block, ending before "\n\nHere is the match".
-    # This gives Claude a cleaner instruction hierarchy.
-    parts = prompt.split("\n\nHere is the match data", 1)
-
-    if len(parts) == 2:
-        # Successfully split — persona goes to system, rest to user
-        system_content = parts[0].strip()
-        user_content = "Here is the match data" + parts[1].strip()
-    else:
-        # Fallback: if splitting fails for any reason, send everything
-        # as the user message. The output quality will be nearly identical.
-        system_content = (
-            "You are an expert sports content writer for social media Stories. "
-            "Follow the user's instructions exactly."
+def _get_client() -> anthropic.Anthropic:
+    """
+    Returns the shared Anthropic client, creating it on the first call.
+
+    Raises:
+        ValueError: If the API key is missing.
+    """
+    global _client
+
+    if _client is None:
+        # The SDK reads the api_key and handles authentication for every
+        # subsequent request made through this client.
+        # max_retries=0 turns off the SDK's own retries — we do our own in
+        # _retry_delay() so the policy lives in one place and is logged.
+        _client = anthropic.Anthropic(api_key=_get_api_key(), max_retries=0)
+
+    return _client
+
+
+def _get_async_client() -> anthropic.AsyncAnthropic:
+    """
+    Returns the shared AsyncAnthropic client, creating it on the first call.
+
+    The async client's connection pool belongs to the event loop it was first
+    used on, so it should only be used from inside one asyncio.run() — which
+    is exactly how main.py drives it.
+
+    Raises:
+        ValueError: If the API key is missing.
+    """
+    global _async_client
+
+    if _async_client is None:
+        _async_client = anthropic.AsyncAnthropic(
+            api_key=_get_api_key(), max_retries=0
         )
-        user_content = prompt
 
-    print("🤖 Sending prompt to Claude...")
+    return _async_client
+
+
+def warm_up() -> None:
+    """
+    Checks the API key and creates the shared async client ahead of time.
+
+    main.py calls this at startup, so the client's connection pool is ready
+    before the first generation and a missing API key is reported before
+    the user has picked a team, rather than halfway through a run.
+
+    Raises:
+        ValueError: If the API key is missing.
+    """
+    _get_async_client()
+
+
+def _build_request(prompt: list) -> dict:
+    """
+    Turns a prompt from prompt_builder into keyword arguments for
+    messages.create(). Shared by the sync and async entry points so both
+    send exactly the same request.
+    """
+
+    # Split our prompt into system and user parts.
+    # prompt_builder gives us a list of content blocks: the first holds the
+    # static instructions (persona, task, output format) and is already
+    # marked with cache_control; the rest hold this match's data.
+    # The static block becomes the system prompt, the rest the user message.
+    # This gives Claude a cleaner instruction hierarchy.
+    system_blocks = prompt[:1]
+    user_blocks = prompt[1:]
 
-    # Step 4: Make the API call.
-    # This is the core of this entire module — one method call.
     # Let's break down every parameter:
     #
     #   model: which Claude model to use. claude-sonnet-4-5-20250929 is
@@ -81,44 +165,347 @@ def generate_story(prompt: str) -> str:
     #               (which will be ~200-300 tokens). This is a safety cap,
     #               not a target — Claude will stop when it's done.
     #
-    #   system: the standing brief. Sets Claude's persona and behaviour
-    #           for the entire interaction.
+    #   system: the standing brief. Sets Claude's persona, task and output
+    #           format for the entire interaction. It's a list of content
+    #           blocks rather than a plain string so the block can carry
+    #           cache_control. It's identical on every call, so once it's
+    #           long enough to be cached (1024+ tokens for Sonnet — it's
+    #           shorter today, see prompt_builder) Anthropic would bill
+    #           later reads at a fraction of the normal input-token price.
     #
     #   messages: the conversation. We send one user message containing
-    #             the match data, task instructions, and format spec.
+    #             the match data and tone guidance.
     #             The list structure supports multi-turn conversations,
     #             but we only need one turn here.
-    response = client.messages.create(
-        model="claude-sonnet-4-5-20250929",
-        max_tokens=1024,
-        system=system_content,
-        messages=[
+    return {
+        "model": "claude-sonnet-4-5-20250929",
+        "max_tokens": 1024,
+        "system": system_blocks,
+        "messages": [
             {
                 "role": "user",
-                "content": user_content
+                "content": user_blocks
             }
         ]
-    )
+    }
 
-    # Step 5: Extract the text from the response object.
-    # The SDK returns a Message object, not a plain string.
-    # response.content is a list of content blocks (Claude can return
-    # multiple blocks in advanced use cases like tool use).
-    # For a standard text response, we always want content[0].text.
-    #
-    # response.usage gives you the token counts for this call —
-    # we log them so you can see exactly what each call costs.
-    input_tokens = response.usage.input_tokens
-    output_tokens = response.usage.output_tokens
 
-    print(f"✅ Response received.")
-    print(f"📊 Tokens used — Input: {input_tokens} | Output: {output_tokens} | "
+def _log_usage(usage, tag: str = "") -> None:
+    """
+    Prints the token counts for one call so you can see exactly what it cost.
+    tag (e.g. "[lakers] ") prefixes each line — see generate_story_async().
+
+    The two cache fields tell you whether prompt caching kicked in:
+    cache_creation_input_tokens is non-zero when the instructions were written
+    to the cache, cache_read_input_tokens when it was served from it.
+    Older responses may leave them as None, so we default to 0. Both stay 0
+    while the static instructions are below the model's minimum cacheable
+    length — that's expected, not a bug (see prompt_builder).
+    """
+    input_tokens = usage.input_tokens
+    output_tokens = usage.output_tokens
+    cache_write_tokens = usage.cache_creation_input_tokens or 0
+    cache_read_tokens = usage.cache_read_input_tokens or 0
+
+    print(f"✅ {tag}Response received.")
+    print(f"📊 {tag}Tokens used — Input: {input_tokens} | Output: {output_tokens} | "
           f"Total: {input_tokens + output_tokens}")
+    print(f"🗄️  {tag}Prompt cache — Written: {cache_write_tokens} | "
+          f"Read: {cache_read_tokens}")
+
+
+def _cache_key(request: dict) -> str:
+    """
+    Returns a stable SHA-256 hex digest for a request built by _build_request().
+
+    sort_keys=True makes the JSON (and therefore the hash) independent of
+    dict ordering, so the same model + system + user content always maps
+    to the same key.
+    """
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _read_cache(key: str):
+    """
+    Returns the cached response text for a key, or None on a miss.
+
+    An entry older than _CACHE_TTL seconds counts as a miss. A corrupt or
+    unreadable entry is also treated as a miss — the cache is only an
+    optimisation, so it must never be the reason a run fails.
+    """
+    path = os.path.join(_CACHE_DIR, f"{key}.json")
+
+    try:
+        if time.time() - os.path.getmtime(path) >= _CACHE_TTL:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["text"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_cache(key: str, text: str, usage) -> None:
+    """
+    Stores a response text and its token counts under the given key.
+
+    Like the other writers in this project, we write to a temporary file and
+    os.replace() it into place, so a concurrent reader never picks up a
+    half-written cache entry.
+    """
+    path = os.path.join(_CACHE_DIR, f"{key}.json")
+
+    entry = {
+        "text": text,
+        "usage": {
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+        },
+    }
+
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # Same reasoning as _read_cache(): a failed cache write is worth
+        # a warning, not a failed run.
+        print(f"⚠️  Could not write LLM cache entry: {e}")
+
+
+def _retry_delay(error: anthropic.APIError, attempt: int, tag: str = ""):
+    """
+    Decides whether a failed call is worth retrying.
+
+    Args:
+        error:   The exception raised by the SDK.
+        attempt: Zero-based index of the attempt that just failed.
+        tag:     Prefix for the log line, e.g. "[lakers] ".
+
+    Returns:
+        How many seconds to wait before the next attempt, or None if the
+        error should be raised instead (not retryable, or out of attempts).
+    """
+    if attempt + 1 >= _MAX_ATTEMPTS:
+        return None
+
+    delay = None
+
+    if isinstance(error, anthropic.APIStatusError):
+        if error.status_code not in _RETRYABLE_STATUS_CODES:
+            return None
+        # Retry-After is normally a number of seconds. It can also be an
+        # HTTP date, which we don't bother parsing — backoff is fine there.
+        # So is a value that isn't a finite number ("nan", "inf"). A
+        # negative one is treated as "retry now", since time.sleep() would
+        # reject it and hide the real API error.
+        retry_after = error.response.headers.get("retry-after")
+        if retry_after is not None:
+            try:
+                seconds = float(retry_after)
+            except ValueError:
+                seconds = math.nan
+            if math.isfinite(seconds):
+                delay = max(0.0, min(seconds, _MAX_RETRY_AFTER))
+    elif not isinstance(error, anthropic.APIConnectionError):
+        # Connection errors and timeouts never reached the server, so
+        # they're always worth another try. Anything else is not.
+        return None
+
+    if delay is None:
+        delay = 2 ** attempt + random.random()
+
+    print(f"⚠️  {tag}Claude call failed ({type(error).__name__}). "
+          f"Retrying in {delay:.1f}s (attempt {attempt + 2}/{_MAX_ATTEMPTS})...")
+    return delay
+
+
+def _call_claude(client: anthropic.Anthropic, request: dict) -> tuple:
+    """
+    Sends one request to Claude and returns (response_text, usage).
+
+    When streaming, messages.stream() yields the response text in chunks as
+    Claude generates it. We collect the chunks and join them at the end;
+    get_final_message() then gives us the usual Message object, complete
+    with token counts.
+
+    Without streaming, the SDK returns a Message object once generation is
+    finished. response.content is a list of content blocks (Claude can return
+    multiple blocks in advanced use cases like tool use). For a standard
+    text response, we always want content[0].text.
+    """
+    if not _STREAM:
+        response = client.messages.create(**request)
+        return response.content[0].text, response.usage
+
+    chunks = []
+    with client.messages.stream(**request) as stream:
+        for text in stream.text_stream:
+            chunks.append(text)
+            print(".", end="", flush=True)
+        final_message = stream.get_final_message()
+    print()
+
+    return "".join(chunks), final_message.usage
+
+
+async def _call_claude_async(client: anthropic.AsyncAnthropic, request: dict,
+                             tag: str = "") -> tuple:
+    """
+    Async version of _call_claude().
+
+    Several of these can stream at once, and their progress dots would all
+    land on the same line. So when the call is tagged (see
+    generate_story_async()) we print a single labelled line as the first
+    chunk arrives instead of a dot per chunk.
+    """
+    if not _STREAM:
+        response = await client.messages.create(**request)
+        return response.content[0].text, response.usage
+
+    chunks = []
+    async with client.messages.stream(**request) as stream:
+        async for text in stream.text_stream:
+            chunks.append(text)
+            if not tag:
+                print(".", end="", flush=True)
+            elif len(chunks) == 1:
+                print(f"✍️  {tag}Claude is writing...")
+        final_message = await stream.get_final_message()
+    if not tag:
+        print()
+
+    return "".join(chunks), final_message.usage
+
+
+def _cached_or_none(key, tag: str = ""):
+    """
+    Returns the cached response for a cache key, or None if we need to call
+    Claude. key is None when the response cache is switched off, and tag
+    prefixes the log line.
+
+    Shared by generate_story() and generate_story_async(), along with
+    _finish(), so the cache policy lives in one place.
+    """
+    if key is not None:
+        cached = _read_cache(key)
+        if cached is not None:
+            print(f"🗄️  {tag}Using cached Claude response (no API call made).")
+            return cached
+
+    print(f"🤖 {tag}Sending prompt to Claude...")
+    return None
+
+
+def _finish(key, text: str, usage, tag: str = "") -> str:
+    """
+    Logs what a completed call cost, caches its response (if the cache is
+    on) and returns the text.
+    """
+    _log_usage(usage, tag)
+
+    if key is not None:
+        _write_cache(key, text, usage)
 
     # Return just the text string — everything else in the response
     # object (model name, stop reason, usage) is logged above but
     # not passed forward. The next module only needs the text.
-    return response.content[0].text
+    return text
+
+
+def generate_story(prompt: list) -> str:
+    """
+    Sends a prompt to Claude and returns the generated text response.
+
+    Args:
+        prompt: The content blocks from prompt_builder.build_prompt()
+
+    Returns:
+        Claude's raw response as a string (should be a JSON object).
+
+    Raises:
+        ValueError: If the API key is missing.
+        anthropic.APIError: If the API call fails.
+    """
+
+    # Step 1: Get the shared Anthropic client.
+    # This also validates the API key the first time it's called.
+    client = _get_client()
+
+    # Step 2: Check the response cache (only when LLM_CACHE_ENABLE=1).
+    # The parameters are built (and explained) in _build_request().
+    request = _build_request(prompt)
+    key = _cache_key(request) if _CACHE_ENABLED else None
+    cached = _cached_or_none(key)
+    if cached is not None:
+        return cached
+
+    # Step 3: Make the API call, retrying transient failures.
+    # This is the core of this entire module — see _call_claude() for
+    # the streaming and non-streaming variants, and _retry_delay() for
+    # which errors are retried and how long we wait.
+    for attempt in range(_MAX_ATTEMPTS):
+        try:
+            text, usage = _call_claude(client, request)
+            break
+        except anthropic.APIError as e:
+            delay = _retry_delay(e, attempt)
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+    # Step 4: Log what the call cost and cache the result.
+    return _finish(key, text, usage)
+
+
+async def generate_story_async(prompt: list, label: str = None) -> str:
+    """
+    Async version of generate_story().
+
+    While this coroutine waits on Claude, the event loop is free to run
+    other coroutines — so main.py can have the requests for both teams
+    in flight at once instead of waiting for one to finish before
+    starting the next.
+
+    Args:
+        prompt: The content blocks from prompt_builder.build_prompt()
+        label:  Optional name for this request, e.g. the team key. Pass one
+                whenever several requests may run at once: every log line
+                is then prefixed with it, and streaming progress is a
+                single labelled line rather than per-chunk dots, so the
+                output of concurrent requests stays readable.
+
+    Returns:
+        Claude's raw response as a string (should be a JSON object).
+
+    Raises:
+        ValueError: If the API key is missing.
+        anthropic.APIError: If the API call fails.
+    """
+    client = _get_async_client()
+    tag = f"[{label}] " if label else ""
+
+    request = _build_request(prompt)
+    key = _cache_key(request) if _CACHE_ENABLED else None
+    cached = _cached_or_none(key, tag)
+    if cached is not None:
+        return cached
+
+    for attempt in range(_MAX_ATTEMPTS):
+        try:
+            text, usage = await _call_claude_async(client, request, tag)
+            break
+        except anthropic.APIError as e:
+            delay = _retry_delay(e, attempt, tag)
+            if delay is None:
+                raise
+            # asyncio.sleep, not time.sleep — the other team's pipeline
+            # keeps running while this one backs off.
+            await asyncio.sleep(delay)
+
+    return _finish(key, text, usage, tag)
 
 
 if __name__ == "__main__":
@@ -3,17 +3,35 @@
 # preview file to the output/ directory.
 # This module knows about HTML and CSS. It knows nothing about APIs or JSON parsing.
 
+import functools
 import os
+import re
+import string  # standard library — string.Template for the page skeleton
+import time
 from datetime import datetime
+from html import escape as _esc  # C-accelerated; turns < > & " ' into entities
 
+# Shared with story_parser so a story's .json and .html files use the same
+# naming scheme (and, when main.py passes one stem to both, the same name).
+from output_names import new_output_stem
 
-def render_html(story: dict, team_key: str) -> str:
+# Where rendered HTML files are written: output/ next to this file.
+# We resolve the path and create the directory once, at import time,
+# rather than repeating both on every render.
+_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "output")
+os.makedirs(_OUTPUT_DIR, exist_ok=True)
+
+
+def render_html(story: dict, team_key: str, stem: str = None) -> str:
     """
     Generates a styled HTML preview of the Story slides.
 
     Args:
         story:    The validated dictionary returned by story_parser.parse_and_save()
         team_key: "lakers" or "manutd" — used for theming and filename
+        stem:     Optional filename (without extension) — pass the stem the
+                  story's JSON was saved under so the two files match.
+                  A new one is made with new_output_stem() if omitted.
 
     Returns:
         The full path of the written HTML file.
@@ -26,20 +44,112 @@ def render_html(story: dict, team_key: str) -> str:
 
     # Step 2: Generate the HTML string for each slide.
     # We build each slide as a separate HTML block, then join them.
-    slides_html = "\n".join(
-    _render_slide(slide, theme, story["result"]) for slide in story["slides"]
-)
+    # Every template starts with a newline, so "" is the right separator.
+    result = story["result"]
+    slides_html = "".join(
+        [_render_slide(slide, theme, result) for slide in story["slides"]]
+    )
 
     # Step 3: Wrap the slides in a full HTML document.
-    html = _build_document(story, slides_html, theme)
+    # The footer shows today's date — see _footer_date() for why it's cached.
+    today = _footer_date(int(time.time() // 60))
+    html = _build_document(story, slides_html, theme, today)
 
     # Step 4: Write the file.
-    output_path = _write_html(html, team_key)
+    output_path = _write_html(html, stem or new_output_stem(team_key))
 
     print(f"🎨 HTML preview saved to: {output_path}")
     return output_path
 
 
+# --- Colour themes ---
+# Base palettes using each team's official brand colours.
+# Lakers: purple (#552583) and gold (#FDB927)
+# Man Utd: red (#DA291C) and gold/yellow (#FBE122)
+_PALETTES = {
+    "lakers": {
+        "bg": "#1a0533",
+        "accent": "#FDB927",
+        "accent2": "#552583",
+        "text": "#FFFFFF",
+        "subtext": "#E0D0F0",
+        "card_bg": "#2d0f52",
+    },
+    "manutd": {
+        "bg": "#1a0505",
+        "accent": "#DA291C",
+        "accent2": "#FBE122",
+        "text": "#FFFFFF",
+        "subtext": "#F0D0D0",
+        "card_bg": "#2d0a0a",
+    }
+}
+
+# Fallback palette for any team not in the dict — clean dark theme.
+_DEFAULT_PALETTE = {
+    "bg": "#0f0f0f",
+    "accent": "#00ff88",
+    "accent2": "#005533",
+    "text": "#FFFFFF",
+    "subtext": "#CCCCCC",
+    "card_bg": "#1a1a1a",
+}
+
+# Result colour for the badge shown on the headline slide.
+_RESULT_COLOURS = {
+    "WIN":  "#00C851",  # green
+    "LOSS": "#ff4444",  # red
+    "DRAW": "#ffbb33",  # amber
+}
+_DEFAULT_RESULT_COLOUR = "#888888"
+
+# Every theme value is injected straight into inline CSS, so each one must
+# be a plain #RRGGBB hex colour — anything else could break the stylesheet.
+_HEX_COLOUR = re.compile(r"#[0-9A-Fa-f]{6}")
+
+
+def _normalise_colour(name: str, value: str) -> str:
+    """
+    Checks that a theme colour is a #RRGGBB hex string and returns it in
+    upper case, so every theme is written the same way.
+
+    Raises:
+        ValueError: If the colour isn't a valid hex colour.
+    """
+    if not _HEX_COLOUR.fullmatch(value):
+        raise ValueError(f"Theme colour '{name}' must be #RRGGBB, got {value!r}")
+    return value.upper()
+
+
+def _build_theme_table() -> dict:
+    """
+    Precomputes every theme _get_theme() can return.
+
+    There are only a few teams and three results, so rather than merging
+    palettes on every render we build all the combinations once at import.
+    None stands for "any team/result we don't have colours for".
+
+    Every colour is validated and normalised here too, so a typo in a
+    palette fails loudly at import instead of silently in a rendered page.
+    """
+    table = {}
+    for team_key in (*_PALETTES, None):
+        palette = _PALETTES.get(team_key, _DEFAULT_PALETTE)
+        for result in (*_RESULT_COLOURS, None):
+            theme = {
+                **palette,
+                "result_tag": _RESULT_COLOURS.get(result, _DEFAULT_RESULT_COLOUR),
+            }
+            table[(team_key, result)] = {
+                name: _normalise_colour(name, value)
+                for name, value in theme.items()
+            }
+    return table
+
+
+_THEME_TABLE = _build_theme_table()
+
+
 def _get_theme(team_key: str, result: str) -> dict:
     """
     Returns a colour theme dictionary for the given team and result.
@@ -52,150 +162,126 @@ def _get_theme(team_key: str, result: str) -> dict:
     - subtext:    secondary text colour (slightly muted)
     - card_bg:    slide card background (slightly lighter than page bg)
     - result_tag: colour of the WIN/LOSS/DRAW badge
-    """
-
-    # Base palettes using each team's official brand colours.
-    # Lakers: purple (#552583) and gold (#FDB927)
-    # Man Utd: red (#DA291C) and gold/yellow (#FBE122)
-    palettes = {
-        "lakers": {
-            "bg": "#1a0533",
-            "accent": "#FDB927",
-            "accent2": "#552583",
-            "text": "#FFFFFF",
-            "subtext": "#E0D0F0",
-            "card_bg": "#2d0f52",
-        },
-        "manutd": {
-            "bg": "#1a0505",
-            "accent": "#DA291C",
-            "accent2": "#FBE122",
-            "text": "#FFFFFF",
-            "subtext": "#F0D0D0",
-            "card_bg": "#2d0a0a",
-        }
-    }
-
-    # Fallback palette for any team not in the dict — clean dark theme.
-    base = palettes.get(team_key, {
-        "bg": "#0f0f0f",
-        "accent": "#00ff88",
-        "accent2": "#005533",
-        "text": "#FFFFFF",
-        "subtext": "#CCCCCC",
-        "card_bg": "#1a1a1a",
-    })
-
-    # Result colour for the badge shown on the headline slide.
-    result_colours = {
-        "WIN":  "#00C851",  # green
-        "LOSS": "#ff4444",  # red
-        "DRAW": "#ffbb33",  # amber
-    }
-    base["result_tag"] = result_colours.get(result, "#888888")
-
-    return base
-
-
-def _render_slide(slide: dict, theme: dict, result: str = "") -> str:
-
-    slide_type = slide.get("type")
-
-    if slide_type == "headline":
-        return _render_headline(slide, theme, result)  # pass result through
-    elif slide_type == "stat":
-        return _render_stat(slide, theme)
-    elif slide_type == "cta":
-        return _render_cta(slide, theme)
-    else:
-        return f'<div class="slide"><p>Unknown slide type: {slide_type}</p></div>'
 
+    The returned dict is shared from _THEME_TABLE — read it, don't modify it.
+    """
 
-def _render_headline(slide: dict, theme: dict, result: str = "") -> str:
-    return f"""
+    # The common case is a single lookup. The fallbacks cover an unknown
+    # result, an unknown team, or both.
+    return (
+        _THEME_TABLE.get((team_key, result))
+        or _THEME_TABLE.get((team_key, None))
+        or _THEME_TABLE.get((None, result))
+        or _THEME_TABLE[(None, None)]
+    )
+
+
+# --- Slide templates ---
+# One str.format template per slide type, defined once at import time.
+# Fields are looked up by index into the dicts passed to .format():
+# {slide[text]} is the slide's copy, {theme[text]} is the theme's text colour.
+# Keeping the two namespaced matters because both dicts have a "text" key.
+_HEADLINE_TMPL = """
     <div class="slide headline-slide" style="
-        background: linear-gradient(160deg, {theme['card_bg']} 0%, {theme['accent2']} 100%);
-        border-top: 4px solid {theme['accent']};
+        background: linear-gradient(160deg, {theme[card_bg]} 0%, {theme[accent2]} 100%);
+        border-top: 4px solid {theme[accent]};
     ">
-        <div class="result-badge" style="background: {theme['result_tag']}">
+        <div class="result-badge" style="background: {theme[result_tag]}">
             {result}
         </div>
-        <h1 class="headline-text" style="color: {theme['accent']}">
-            {slide['text']}
+        <h1 class="headline-text" style="color: {theme[accent]}">
+            {slide[text]}
         </h1>
-        <p class="subtext" style="color: {theme['subtext']}">
-            {slide['subtext']}
+        <p class="subtext" style="color: {theme[subtext]}">
+            {slide[subtext]}
         </p>
         <div class="slide-type-label">STORY</div>
     </div>"""
 
-
-def _render_stat(slide: dict, theme: dict) -> str:
-    """Renders a stat slide — label, large value, narrative sentence."""
-    return f"""
+# Stat slide — label, large value, narrative sentence.
+_STAT_TMPL = """
     <div class="slide stat-slide" style="
-        background: {theme['card_bg']};
-        border-left: 4px solid {theme['accent']};
+        background: {theme[card_bg]};
+        border-left: 4px solid {theme[accent]};
     ">
-        <p class="stat-label" style="color: {theme['accent']}">
-            {slide['stat_label']}
+        <p class="stat-label" style="color: {theme[accent]}">
+            {slide[stat_label]}
         </p>
-        <h2 class="stat-value" style="color: {theme['text']}">
-            {slide['stat_value']}
+        <h2 class="stat-value" style="color: {theme[text]}">
+            {slide[stat_value]}
         </h2>
-        <p class="narrative" style="color: {theme['subtext']}">
-            {slide['narrative']}
+        <p class="narrative" style="color: {theme[subtext]}">
+            {slide[narrative]}
         </p>
     </div>"""
 
-
-def _render_cta(slide: dict, theme: dict) -> str:
-    """Renders the CTA slide — fanbase label, follow prompt, branded button."""
-    return f"""
+# CTA slide — fanbase label, follow prompt, branded button.
+_CTA_TMPL = """
     <div class="slide cta-slide" style="
-        background: linear-gradient(160deg, {theme['accent2']} 0%, {theme['card_bg']} 100%);
-        border-top: 4px solid {theme['accent']};
+        background: linear-gradient(160deg, {theme[accent2]} 0%, {theme[card_bg]} 100%);
+        border-top: 4px solid {theme[accent]};
     ">
-        <h2 class="cta-text" style="color: {theme['text']}">
-            {slide['text']}
+        <h2 class="cta-text" style="color: {theme[text]}">
+            {slide[text]}
         </h2>
-        <p class="cta-subtext" style="color: {theme['subtext']}">
-            {slide['subtext']}
+        <p class="cta-subtext" style="color: {theme[subtext]}">
+            {slide[subtext]}
         </p>
         <div class="cta-button" style="
-            background: {theme['accent']};
-            color: {theme['bg']};
+            background: {theme[accent]};
+            color: {theme[bg]};
         ">
             Follow Now
         </div>
     </div>"""
 
+_UNKNOWN_TMPL = '\n    <div class="slide"><p>Unknown slide type: {slide_type}</p></div>'
 
-def _build_document(story: dict, slides_html: str, theme: dict) -> str:
-    """
-    Wraps the slide HTML in a complete, self-contained HTML document.
+# Dispatch table: slide type -> template. Adding a slide type means adding
+# one template above and one entry here.
+_TMPLS = {
+    "headline": _HEADLINE_TMPL,
+    "stat": _STAT_TMPL,
+    "cta": _CTA_TMPL,
+}
 
-    All CSS is inlined in a <style> block — no external files needed.
-    The CSS uses a mobile-first approach with a max-width that mirrors
-    the aspect ratio of a real Stories feed (~390px wide).
+
+def _render_slide(slide: dict, theme: dict, result: str = "") -> str:
     """
+    Renders one slide by filling in the template for its type.
 
-    # We use Python's triple-quoted f-string to write the full HTML document.
-    # Every {variable} here is a Python variable being injected.
-    # The double braces {{ and }} are escaped braces — they render as
-    # literal { and } in the HTML output, not Python substitutions.
-    return f"""<!DOCTYPE html>
+    Slide text comes straight from Claude, so we HTML-escape every field
+    before it goes into the page. A stray < or & in the copy would
+    otherwise break the markup and force a re-run (and re-billing) of the
+    whole generation.
+    """
+    slide_type = slide.get("type")
+    template = _TMPLS.get(slide_type, _UNKNOWN_TMPL)
+    safe_slide = {key: _esc(str(value)) for key, value in slide.items()}
+    return template.format(
+        slide=safe_slide,
+        theme=theme,
+        result=_esc(result),
+        slide_type=_esc(str(slide_type)),
+    )
+
+
+# --- Document template ---
+# The full page is ~3KB of mostly fixed HTML and CSS. Rather than rebuilding
+# it as one giant f-string on every render, we define it once here as a
+# string.Template. Each $name is filled in by _build_document().
+# string.Template uses $ instead of {}, so the CSS braces need no escaping.
+_DOC_TEMPLATE = string.Template("""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{story['team']} — Match Story</title>
+    <title>$team — Match Story</title>
     <style>
         /* Page reset and base */
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
+        * { margin: 0; padding: 0; box-sizing: border-box; }
 
-        body {{
-            background: {theme['bg']};
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI',
                          'Helvetica Neue', Arial, sans-serif;
             min-height: 100vh;
@@ -203,33 +289,31 @@ def _build_document(story: dict, slides_html: str, theme: dict) -> str:
             flex-direction: column;
             align-items: center;
             padding: 40px 20px;
-        }}
+        }
 
         /* Header bar above the cards */
-        .story-header {{
+        .story-header {
             width: 100%;
             max-width: 390px;
             margin-bottom: 24px;
             text-align: center;
-        }}
+        }
 
-        .story-header .team-name {{
-            color: {theme['accent']};
+        .story-header .team-name {
             font-size: 13px;
             font-weight: 700;
             letter-spacing: 3px;
             text-transform: uppercase;
-        }}
+        }
 
-        .story-header .match-info {{
-            color: {theme['subtext']};
+        .story-header .match-info {
             font-size: 12px;
             margin-top: 4px;
-        }}
+        }
 
         /* Each slide card — Story aspect ratio is roughly 9:16.
            390px wide × 693px tall mirrors a real phone Stories screen. */
-        .slide {{
+        .slide {
             width: 390px;
             min-height: 240px;
             border-radius: 16px;
@@ -240,25 +324,25 @@ def _build_document(story: dict, slides_html: str, theme: dict) -> str:
             flex-direction: column;
             justify-content: center;
             overflow: hidden;
-        }}
+        }
 
         /* Headline slide */
-        .headline-text {{
+        .headline-text {
             font-size: 42px;
             font-weight: 900;
             line-height: 1.05;
             letter-spacing: -1px;
             margin-bottom: 16px;
             text-transform: uppercase;
-        }}
+        }
 
-        .subtext {{
+        .subtext {
             font-size: 16px;
             line-height: 1.5;
             font-weight: 400;
-        }}
+        }
 
-        .result-badge {{
+        .result-badge {
             display: inline-block;
             padding: 4px 12px;
             border-radius: 20px;
@@ -269,9 +353,9 @@ def _build_document(story: dict, slides_html: str, theme: dict) -> str:
             color: #000;
             margin-bottom: 20px;
             align-self: flex-start;
-        }}
+        }
 
-        .slide-type-label {{
+        .slide-type-label {
             position: absolute;
             top: 16px;
             right: 20px;
@@ -279,47 +363,46 @@ def _build_document(story: dict, slides_html: str, theme: dict) -> str:
             font-weight: 700;
             letter-spacing: 3px;
             color: rgba(255,255,255,0.25);
-        }}
+        }
 
         /* Stat slide */
-        .stat-label {{
+        .stat-label {
             font-size: 11px;
             font-weight: 800;
             letter-spacing: 3px;
             text-transform: uppercase;
             margin-bottom: 12px;
-        }}
+        }
 
-        .stat-value {{
+        .stat-value {
             font-size: 56px;
             font-weight: 900;
             letter-spacing: -2px;
             line-height: 1;
             margin-bottom: 20px;
-        }}
+        }
 
-        .narrative {{
+        .narrative {
             font-size: 15px;
             line-height: 1.6;
             font-weight: 400;
-        }}
+        }
 
         /* CTA slide */
-        .cta-text {{
+        .cta-text {
             font-size: 28px;
             font-weight: 900;
             line-height: 1.2;
             margin-bottom: 12px;
-            color: {theme['text']};
-        }}
+        }
 
-        .cta-subtext {{
+        .cta-subtext {
             font-size: 15px;
             line-height: 1.5;
             margin-bottom: 28px;
-        }}
+        }
 
-        .cta-button {{
+        .cta-button {
             display: inline-block;
             padding: 12px 28px;
             border-radius: 30px;
@@ -329,10 +412,10 @@ def _build_document(story: dict, slides_html: str, theme: dict) -> str:
             text-transform: uppercase;
             align-self: flex-start;
             cursor: pointer;
-        }}
+        }
 
         /* Footer */
-        .story-footer {{
+        .story-footer {
             width: 100%;
             max-width: 390px;
             text-align: center;
@@ -340,63 +423,136 @@ def _build_document(story: dict, slides_html: str, theme: dict) -> str:
             color: rgba(255,255,255,0.2);
             font-size: 11px;
             letter-spacing: 1px;
-        }}
+        }
+
+        /* Team colours — the only rules that change between renders */
+$theme_css
     </style>
 </head>
 <body>
 
     <div class="story-header">
-        <div class="team-name">{story['team']}</div>
-        <div class="match-info">{story['match']} &nbsp;·&nbsp; {story['date']}</div>
+        <div class="team-name">$team</div>
+        <div class="match-info">$match &nbsp;·&nbsp; $date</div>
     </div>
 
-    {slides_html}
+    $slides_html
 
     <div class="story-footer">
         Generated by Sports Stories Generator &nbsp;·&nbsp;
-        {datetime.now().strftime("%d %b %Y")}
+        $today
     </div>
 
 </body>
-</html>"""
+</html>""")
+
+# The team-coloured CSS rules, injected into _DOC_TEMPLATE as $theme_css.
+# This one uses str.format placeholders, so literal CSS braces are doubled.
+_THEME_CSS = """\
+        body {{ background: {bg}; }}
+        .story-header .team-name {{ color: {accent}; }}
+        .story-header .match-info {{ color: {subtext}; }}
+        .cta-text {{ color: {text}; }}"""
+
+
+@functools.lru_cache(maxsize=1)
+def _footer_date(minute: int) -> str:
+    """
+    Returns today's date for the page footer, e.g. "13 Feb 2026".
 
+    The argument is the current Unix time in whole minutes. It isn't used
+    in the body — it's the cache key. lru_cache(maxsize=1) remembers the
+    last result, so every render within the same minute (like both teams
+    in one run) reuses the formatted string, and a new minute formats a
+    fresh one, so the date rolls over correctly at midnight.
+    """
+    return datetime.now().strftime("%d %b %Y")
 
-def _write_html(html: str, team_key: str) -> str:
-    """Writes the HTML string to a timestamped file in output/."""
 
-    output_dir = os.path.join(os.path.dirname(__file__), "output")
-    os.makedirs(output_dir, exist_ok=True)
+def _build_document(story: dict, slides_html: str, theme: dict, today: str) -> str:
+    """
+    Wraps the slide HTML in a complete, self-contained HTML document.
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{team_key}_story_{timestamp}.html"
-    output_path = os.path.join(output_dir, filename)
+    All CSS is inlined in a <style> block — no external files needed.
+    The CSS uses a mobile-first approach with a max-width that mirrors
+    the aspect ratio of a real Stories feed (~390px wide).
+    """
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(html)
+    # Only a handful of CSS rules depend on the team's colours. We build
+    # just those here; everything else lives in _DOC_TEMPLATE, which is
+    # built once at import time.
+    theme_css = _THEME_CSS.format_map(theme)
+
+    # The header fields come from Claude too, so they're escaped like
+    # the slide text in _render_slide().
+    return _DOC_TEMPLATE.substitute(
+        team=_esc(str(story["team"])),
+        match=_esc(str(story["match"])),
+        date=_esc(str(story["date"])),
+        theme_css=theme_css,
+        slides_html=slides_html,
+        today=today,
+    )
+
+
+def _write_html(html: str, stem: str) -> str:
+    """Writes the HTML string to output/{stem}.html."""
+    output_path = os.path.join(_OUTPUT_DIR, f"{stem}.html")
+
+    # Encode the whole document once and write the bytes in one go.
+    # Binary mode skips the text-mode encoding layer, which would otherwise
+    # encode the string piece by piece as it passes through.
+    #
+    # We write to a temporary file next to the real one, then os.replace()
+    # it into place. The rename is atomic, so anyone opening output_path
+    # sees either nothing or the complete file — never a half-written one,
+    # even if the run is interrupted mid-write.
+    data = html.encode("utf-8")
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, output_path)
 
     return output_path
 
 
 if __name__ == "__main__":
-    import json
-    import glob
+    # Use orjson to parse if it's installed — it's a faster drop-in for
+    # json.loads(). Both accept the raw bytes, so we skip decoding.
+    try:
+        from orjson import loads
+    except ImportError:
+        from json import loads
+
+    output_dir = "output"
 
     # Find the most recent JSON files for each team in output/
     for team_key in ["lakers", "manutd"]:
-        # glob finds files matching a pattern — * is a wildcard
-        pattern = os.path.join("output", f"{team_key}_story_*.json")
-        matches = sorted(glob.glob(pattern))
-
-        if not matches:
+        # Our filenames embed a sortable timestamp, so the newest file is
+        # simply the one with the largest name. os.scandir() streams the
+        # directory, letting us track that maximum in a single pass
+        # without building and sorting a full list of matches.
+        prefix = f"{team_key}_story_"
+        latest_name = None
+
+        if os.path.isdir(output_dir):
+            with os.scandir(output_dir) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if (name.startswith(prefix) and name.endswith(".json")
+                            and (latest_name is None or name > latest_name)):
+                        latest_name = name
+
+        if latest_name is None:
             print(f"⚠️  No JSON file found for {team_key}. Run story_parser.py first.")
             continue
 
-        # Take the most recent file (last in sorted order)
-        latest_json = matches[-1]
+        latest_json = os.path.join(output_dir, latest_name)
         print(f"\n📂 Loading: {latest_json}")
 
-        with open(latest_json, "r", encoding="utf-8") as f:
-            story = json.load(f)
+        with open(latest_json, "rb") as f:
+            story = loads(f.read())
 
-        html_path = render_html(story, team_key)
-        print(f"✅ Open this in your browser: {html_path}")
\ No newline at end of file
+        # Reuse the JSON file's name, so the preview sits next to it.
+        html_path = render_html(story, team_key, latest_name[:-len(".json")])
+        print(f"✅ Open this in your browser: {html_path}")
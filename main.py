@@ -3,6 +3,7 @@
 # This module coordinates all other modules but contains no business logic itself.
 # If a module is a specialist, main.py is the project manager.
 
+import asyncio  # standard library — runs coroutines concurrently
 import os
 import sys
 import webbrowser  # standard library — opens URLs/files in the default browser
@@ -11,10 +12,13 @@ import webbrowser  # standard library — opens URLs/files in the default browse
 # Each import gives us access to that module's public functions.
 from sports_fetcher import fetch_last_match
 from prompt_builder import build_prompt
-from claude_client import generate_story
+from claude_client import generate_story_async, warm_up
 from story_parser import parse_and_save
 from html_renderer import render_html
 
+# Shared file naming, so each story's JSON and HTML files match.
+from output_names import new_output_stem
+
 
 # --- Team menu configuration ---
 # This dictionary drives both the display menu and the routing logic.
@@ -81,7 +85,7 @@ def get_user_choice() -> str:
               f"Please enter {', '.join(valid_choices[:-1])} or {valid_choices[-1]}.\n")
 
 
-def run_pipeline(team_key: str) -> dict:
+async def run_pipeline(team_key: str) -> dict:
     """
     Runs the full Story generation pipeline for a single team.
 
@@ -90,6 +94,14 @@ def run_pipeline(team_key: str) -> dict:
     the exception propagates up to main() where it's caught and
     displayed cleanly.
 
+    It's a coroutine so that, when several teams are selected, their
+    pipelines can run side by side — see _run_all(). The Claude call is
+    natively async; the other modules are ordinary blocking functions, so
+    we run them with asyncio.to_thread(). That hands the call to a worker
+    thread and frees the event loop to progress the other team meanwhile —
+    the sports API request and file writes block on I/O, which releases
+    the GIL, so the threads genuinely overlap.
+
     Args:
         team_key: "manutd" or "lakers"
 
@@ -109,7 +121,7 @@ def run_pipeline(team_key: str) -> dict:
     # Stage 1: Fetch match data
     # If the API is down or returns no data, fetch_last_match raises
     # a ConnectionError or ValueError — both caught in main().
-    match = fetch_last_match(team_key)
+    match = await asyncio.to_thread(fetch_last_match, team_key)
 
     # Stage 2: Build the prompt
     # Pure Python transformation — shouldn't fail unless match dict
@@ -118,17 +130,25 @@ def run_pipeline(team_key: str) -> dict:
 
     # Stage 3: Call Claude
     # May raise anthropic.APIError for network/auth issues.
-    raw_response = generate_story(prompt)
+    # This is the slow stage (several seconds), so we await it — other
+    # teams' pipelines run while this one waits on the network.
+    # The team key labels Claude's log lines, since both teams may be
+    # streaming at once.
+    raw_response = await generate_story_async(prompt, team_key)
+
+    # Both output files share one name, e.g. lakers_story_20260213_143022_601708,
+    # so a story's JSON and its HTML preview are easy to pair up.
+    stem = new_output_stem(team_key)
 
     # Stage 4: Parse and save JSON
-    # Validates the response and writes output/{team}_story_{timestamp}.json
-    story = parse_and_save(raw_response, team_key)
+    # Validates the response and writes output/{stem}.json
+    story = await asyncio.to_thread(parse_and_save, raw_response, team_key, stem)
 
     # Stage 5: Render HTML
-    # Reads the story dict and writes output/{team}_story_{timestamp}.html
+    # Reads the story dict and writes output/{stem}.html
     # We pass story["result"] explicitly so the headline badge renders correctly.
     # (We noted this edge case at the end of Stage 6.)
-    html_path = render_html(story, team_key)
+    html_path = await asyncio.to_thread(render_html, story, team_key, stem)
 
     # Build a result summary to return to main()
     return {
@@ -139,6 +159,27 @@ def run_pipeline(team_key: str) -> dict:
     }
 
 
+async def _run_all(team_keys: list) -> list:
+    """
+    Runs the pipeline for every team concurrently.
+
+    asyncio.gather() starts all the coroutines at once and waits for every
+    one to finish, so the total time for "both" is roughly the slower of
+    the two runs rather than their sum.
+
+    return_exceptions=True means a failure in one team comes back as an
+    exception object in the results list instead of cancelling the others.
+
+    Returns:
+        One entry per team key, in the same order: either the result dict
+        from run_pipeline() or the exception it raised.
+    """
+    return await asyncio.gather(
+        *(run_pipeline(team_key) for team_key in team_keys),
+        return_exceptions=True
+    )
+
+
 def print_summary(results: list):
     """
     Prints a clean summary of everything generated once the pipeline finishes.
@@ -167,6 +208,16 @@ def main():
     """
 
     print_banner()
+
+    # Create the Claude client up front so its connection pool is ready
+    # before the first generation. A missing API key also surfaces here,
+    # before the user has picked a team, rather than halfway through a run.
+    try:
+        warm_up()
+    except ValueError as e:
+        print(f"\n  ❌ {e}\n")
+        sys.exit(1)
+
     print_menu()
 
     # Get a validated choice from the user
@@ -179,24 +230,27 @@ def main():
     else:
         team_keys = [selected["key"]]
 
-    # Run the pipeline for each selected team, collecting results.
-    # We wrap each run in a try/except so one team failing doesn't
-    # prevent the other from running — important for the "both" option.
+    # Run the pipeline for each selected team concurrently, collecting results.
+    # Each outcome is either a result dict or the exception that team raised.
+    # We re-raise failures inside a try/except so one team failing doesn't
+    # hide the other's result — important for the "both" option.
+    outcomes = asyncio.run(_run_all(team_keys))
     results = []
 
-    for team_key in team_keys:
+    for team_key, outcome in zip(team_keys, outcomes):
         try:
-            result = run_pipeline(team_key)
-            results.append(result)
+            if isinstance(outcome, BaseException):
+                raise outcome
+            results.append(outcome)
 
         except ConnectionError as e:
             # Sports API failure — network or data issue
-            print(f"\n  ❌ Could not fetch match data: {e}")
+            print(f"\n  ❌ Could not fetch match data for {team_key}: {e}")
             print("     Check your internet connection and try again.\n")
 
         except ValueError as e:
             # Bad data or failed parsing — likely a prompt/response issue
-            print(f"\n  ❌ Data error: {e}\n")
+            print(f"\n  ❌ Data error for {team_key}: {e}\n")
 
         except Exception as e:
             # Catch-all for unexpected errors — log the type so it's diagnosable
@@ -0,0 +1,26 @@
+# output_names.py
+# Responsibility: decide what a generated Story's output files are called.
+# Both story_parser (JSON) and html_renderer (HTML) name their files with
+# this one scheme, so neither has to import the other.
+
+import time
+
+
+def new_output_stem(team_key: str) -> str:
+    """
+    Returns a fresh, timestamped filename (without extension) for a story,
+    e.g. "lakers_story_20260213_143022_601708".
+
+    time.strftime formats the current local time as a string directly,
+    without building a datetime object first. "%Y%m%d_%H%M%S" produces
+    something like "20260213_143022", so names sort by age. The six-digit
+    suffix (microseconds from the nanosecond clock) keeps names unique when
+    two stories are saved in the same second — by the two teams in a "both"
+    run, or by two separate runs.
+
+    main.py makes one stem per story and passes it to both
+    story_parser.parse_and_save() and html_renderer.render_html(), so a
+    story's .json and .html files share a name.
+    """
+    micros = time.time_ns() // 1000 % 1_000_000
+    return f"{team_key}_story_{time.strftime('%Y%m%d_%H%M%S')}_{micros:06d}"
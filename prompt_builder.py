@@ -3,116 +3,61 @@
 # This module knows about sports data and prompt engineering.
 # It knows nothing about HTTP calls or file I/O.
 
-def build_prompt(match: dict) -> str:
-    """
-    Constructs a detailed prompt for Claude based on cleaned match data.
-
-    Args:
-        match: The cleaned dictionary returned by sports_fetcher.fetch_last_match()
-
-    Returns:
-        A complete prompt string ready to be sent to the Claude API.
-    """
+import functools  # standard library — lru_cache for the match block
+import json  # standard library — turns unhashable values into cache keys
+import operator  # standard library — itemgetter for unpacking match fields
 
-    # We build the prompt in sections, then join them at the end.
-    # This is easier to read and modify than one giant f-string.
-
-    # --- Section 1: Persona ---
-    # We give Claude a specific professional identity. "Sports content writer
-    # specialising in social media Stories" is more precise than just
-    # "sports writer" — it primes the model for punchy, visual-first language
-    # rather than long-form journalism.
-    persona = (
-        "You are an expert sports content writer specialising in Instagram and "
-        "Snapchat Stories for a B2B sports media platform. Your writing is bold, "
-        "punchy, and visual-first. You write for fans who are scrolling fast — "
-        "every word must earn its place. You never use clichés like 'at the end "
-        "of the day' or 'gave 110 percent'."
-    )
+# The prompt is split into two parts:
+#
+#   1. A static block — persona, task instructions and output format. It is
+#      byte-for-byte identical for every team and every run, so it contains
+#      no match data at all. We mark it with cache_control so Anthropic can
+#      cache it and bill later calls for it at a fraction of the normal
+#      input-token price.
+#
+#      Note: Anthropic only caches a prefix once it reaches the model's
+#      minimum length — 1024 tokens for Sonnet. This block is currently
+#      about 600 tokens, so for now cache_control has no effect and the
+#      "Prompt cache — Written: 0 | Read: 0" log line is expected. It
+#      starts paying off as soon as the instructions grow past that size.
+#
+#   2. A dynamic block — the match data and the tone for this result.
+#      This changes on every call, so it comes after the cached prefix.
+#
+# The static sections are module-level constants, built once at import.
 
-    # --- Section 2: Match Context ---
-    # We inject the actual match data here. Notice we're selective — we give
-    # Claude exactly what it needs to write good copy and nothing more.
-    # Giving it the entire raw API response would add noise and cost tokens.
-    sport = match["sport"]
-    team = match["team_name"]
-    opponent = match["opponent"]
-    result = match["result"]
-    our_score = match["our_score"]
-    opp_score = match["opp_score"]
-    date = match["date"]
-    venue = match["venue"]
-    league = match["league"]
-    location_context = "at home" if match["is_home"] else "on the road"
+# --- Section 1: Persona ---
+# We give Claude a specific professional identity. "Sports content writer
+# specialising in social media Stories" is more precise than just
+# "sports writer" — it primes the model for punchy, visual-first language
+# rather than long-form journalism.
+_PERSONA = (
+    "You are an expert sports content writer specialising in Instagram and "
+    "Snapchat Stories for a B2B sports media platform. Your writing is bold, "
+    "punchy, and visual-first. You write for fans who are scrolling fast — "
+    "every word must earn its place. You never use clichés like 'at the end "
+    "of the day' or 'gave 110 percent'."
+)
 
-    # Build a sport-specific detail line.
-    # For football we have goal scorer details if available.
-    # For basketball we have the point margin, which is more meaningful.
-    if sport == "football" and match.get("goal_details_home"):
-        home_goals = match["goal_details_home"] or "none"
-        away_goals = match["goal_details_away"] or "none"
-        extra_detail = (
-            f"Home goal details: {home_goals}. "
-            f"Away goal details: {away_goals}."
-        )
-    elif sport == "basketball":
-        margin = abs(our_score - opp_score)
-        extra_detail = f"Margin of victory/defeat: {margin} points."
-    else:
-        extra_detail = ""
+# --- Section 2: Task Instructions ---
+# This is the "what to do" section. We specify slide count and constraints.
+# The tone guidance for each result lives in the dynamic block (see
+# _TONE_GUIDANCE below), because it depends on the match.
+_TASK_STATIC = """
+Your task is to generate a 4-slide Instagram/Snapchat Story about the match
+described in the match data you are given.
 
-    match_context = f"""
-Here is the match data you will write about:
-
-- Team: {team}
-- Sport: {sport}
-- League: {league}
-- Opponent: {opponent}
-- Result: {result}
-- Score: {team} {our_score} — {opp_score} {opponent}
-- Date: {date}
-- Venue: {venue}
-- Location: {location_context}
-{extra_detail}
-"""
-
-    # --- Section 3: Task Instructions ---
-    # This is the "what to do" section. We specify slide count, tone guidance
-    # per result type, and constraints. The tone guidance is a product decision:
-    # a WIN Story should feel celebratory, a LOSS Story should feel honest but
-    # forward-looking, a DRAW somewhere in between. This makes the content feel
-    # emotionally intelligent rather than robotically neutral.
-    if result == "WIN":
-        tone_guidance = (
-            "Tone: Celebratory and bold. This is a moment to hype the fanbase. "
-            "Use strong, active language. Make the reader feel the win."
-        )
-    elif result == "LOSS":
-        tone_guidance = (
-            "Tone: Honest and forward-looking. Acknowledge the result directly — "
-            "don't sugarcoat it — but end on a note of resilience or next-game "
-            "motivation. Fans respect honesty."
-        )
-    else:  # DRAW
-        tone_guidance = (
-            "Tone: Measured but engaging. A draw has drama in it — find it. "
-            "Focus on a standout moment or stat that makes the story worth telling."
-        )
-
-    task = f"""
-Your task is to generate a 4-slide Instagram/Snapchat Story about this match.
-
-{tone_guidance}
+Follow the tone guidance provided with the match data.
 
 The 4 slides must be:
-1. HEADLINE slide — A short punchy headline (max 5 words, ALL CAPS) and a 
+1. HEADLINE slide — A short punchy headline (max 5 words, ALL CAPS) and a
    one-sentence subtext (max 15 words) that expands on it.
-2. STAT slide — Focus on the final score. Include a stat_label, stat_value, 
+2. STAT slide — Focus on the final score. Include a stat_label, stat_value,
    and one narrative sentence (max 20 words) giving context.
-3. STAT slide — Pick the most compelling secondary stat or moment from the 
+3. STAT slide — Pick the most compelling secondary stat or moment from the
    data (margin, a scorer, a comeback, a shutout, etc). Same structure.
-4. CTA slide — A call-to-action for the team's fanbase. The text field should 
-   be an account handle style label (e.g. "More from Lakeshow Nation"), and 
+4. CTA slide — A call-to-action for the team's fanbase. The text field should
+   be an account handle style label (e.g. "More from Lakeshow Nation"), and
    subtext should be a one-line follow/engage prompt with a relevant emoji.
 
 Important constraints:
@@ -122,72 +67,240 @@ Important constraints:
 - Write specifically about THIS match. Do not use generic filler content.
 """
 
-    # --- Section 4: Output Format ---
-    # This is the most technically critical section of the prompt.
-    # We tell Claude to return ONLY a JSON object — no preamble, no explanation,
-    # no markdown code fences. Just the raw JSON.
-    #
-    # Why so explicit? Because language models are trained on human conversation,
-    # where it's natural to say "Sure! Here's the JSON: ...". That's charming
-    # in a chatbot but breaks a JSON parser. We explicitly suppress that behavior.
-    #
-    # We also show the exact schema with every field name and type. This acts
-    # like a typed contract — Claude knows exactly what shape to produce.
-    output_format = f"""
+# --- Section 3: Output Format ---
+# This is the most technically critical section of the prompt.
+# We tell Claude to return ONLY a JSON object — no preamble, no explanation,
+# no markdown code fences. Just the raw JSON.
+#
+# Why so explicit? Because language models are trained on human conversation,
+# where it's natural to say "Sure! Here's the JSON: ...". That's charming
+# in a chatbot but breaks a JSON parser. We explicitly suppress that behavior.
+#
+# We also show the exact schema with every field name and type. This acts
+# like a typed contract — Claude knows exactly what shape to produce.
+# The team, date and result values are given in the match data rather than
+# here, so this block stays identical across matches (and cacheable).
+_OUTPUT_FORMAT_STATIC = """
 Return ONLY a valid JSON object. No explanation, no markdown, no code fences.
-Start your response with {{ and end with }}.
+Start your response with { and end with }.
 
 The JSON must follow this exact schema:
 
-{{
-  "team": "{team}",
+{
+  "team": "<team name, exactly as given in the match data>",
   "match": "<event name>",
-  "date": "{date}",
-  "result": "{result}",
+  "date": "<date, exactly as given in the match data>",
+  "result": "<WIN, LOSS or DRAW, exactly as given in the match data>",
   "slides": [
-    {{
+    {
       "type": "headline",
       "text": "<MAX 5 WORDS ALL CAPS>",
       "subtext": "<max 15 words>"
-    }},
-    {{
+    },
+    {
       "type": "stat",
       "stat_label": "<short label e.g. FINAL SCORE>",
       "stat_value": "<the value e.g. 124 - 104>",
       "narrative": "<max 20 words of context>"
-    }},
-    {{
+    },
+    {
       "type": "stat",
       "stat_label": "<short label>",
       "stat_value": "<the value>",
       "narrative": "<max 20 words of context>"
-    }},
-    {{
+    },
+    {
       "type": "cta",
       "text": "<fanbase label>",
       "subtext": "<one-line engage prompt with emoji>"
-    }}
+    }
   ]
-}}
+}
 """
 
-    # Join all sections into one complete prompt string.
-    # We use double newlines between sections for readability —
-    # whitespace in prompts doesn't cost significant tokens but
-    # helps the model parse the structure of your instructions.
-    return f"{persona}\n\n{match_context}\n\n{task}\n\n{output_format}"
+# The three static sections joined into the cacheable prefix.
+# We use double newlines between sections for readability —
+# whitespace in prompts doesn't cost significant tokens but
+# helps the model parse the structure of your instructions.
+#
+# This is built once, and the same block object is reused for every prompt,
+# so the cacheable prefix is literally the same stored string on every call.
+# It's marked with cache_control — see the note at the top of this module.
+# Treat it as read-only.
+_STATIC_BLOCK = {
+    "type": "text",
+    "text": f"{_PERSONA}\n\n{_TASK_STATIC}\n\n{_OUTPUT_FORMAT_STATIC}",
+    "cache_control": {"type": "ephemeral"}
+}
+
+# Tone guidance per result type. This is a product decision: a WIN Story
+# should feel celebratory, a LOSS Story should feel honest but
+# forward-looking, a DRAW somewhere in between. This makes the content feel
+# emotionally intelligent rather than robotically neutral.
+_TONE_GUIDANCE = {
+    "WIN": (
+        "Tone: Celebratory and bold. This is a moment to hype the fanbase. "
+        "Use strong, active language. Make the reader feel the win."
+    ),
+    "LOSS": (
+        "Tone: Honest and forward-looking. Acknowledge the result directly — "
+        "don't sugarcoat it — but end on a note of resilience or next-game "
+        "motivation. Fans respect honesty."
+    ),
+    "DRAW": (
+        "Tone: Measured but engaging. A draw has drama in it — find it. "
+        "Focus on a standout moment or stat that makes the story worth telling."
+    ),
+}
+
+# The fields build_prompt() reads from the match dict, in unpacking order.
+# operator.itemgetter fetches them all in a single call — and, like
+# match["..."], raises KeyError if one is missing.
+_MATCH_FIELDS = operator.itemgetter(
+    "sport", "team_name", "opponent", "result", "our_score", "opp_score",
+    "date", "venue", "league", "is_home",
+)
+
+# The match-specific block, as a str.format template. build_prompt() fills
+# in every placeholder with a single .format() call, rather than assembling
+# the text from several intermediate f-strings.
+_MATCH_CONTEXT_TEMPLATE = """\
+Here is the match data you will write about:
+
+- Team: {team}
+- Sport: {sport}
+- League: {league}
+- Opponent: {opponent}
+- Result: {result}
+- Score: {team} {our_score} — {opp_score} {opponent}
+- Date: {date}
+- Venue: {venue}
+- Location: {location_context}
+{extra_detail}
+
+{tone_guidance}
+
+In the JSON, use exactly "{team}" for "team", "{date}" for "date" and
+"{result}" for "result"."""
+
+
+def build_prompt(match: dict) -> list:
+    """
+    Constructs a detailed prompt for Claude based on cleaned match data.
+
+    Args:
+        match: The cleaned dictionary returned by sports_fetcher.fetch_last_match()
+
+    Returns:
+        A list of two text content blocks ready to be sent to the Claude API:
+        [static instructions (marked for prompt caching), match-specific data]
+    """
+
+    # The static block is shared by every prompt — see _STATIC_BLOCK.
+    # The dynamic block is always a fresh dict, but its text comes from
+    # _build_match_context(), which remembers the text for recent matches.
+    return [
+        _STATIC_BLOCK,
+        {
+            "type": "text",
+            "text": _build_match_context(_match_key(match))
+        }
+    ]
+
+
+def _match_key(match: dict) -> tuple:
+    """
+    Turns a match dict into a hashable, order-independent cache key.
+
+    lru_cache can only key on hashable arguments, and a dict isn't one.
+    We sort the (field, value) pairs, so two dicts with the same contents
+    give the same key whatever order their fields were added in. Any value
+    that isn't a plain scalar (a list, a nested dict) is written out as a
+    JSON string first.
+    """
+    return tuple(sorted(
+        (field, value if isinstance(value, (str, int, float, type(None)))
+         else json.dumps(value, sort_keys=True, default=str))
+        for field, value in match.items()
+    ))
+
+
+# build_prompt() is deterministic: the same match always produces the same
+# text. So we cache the finished match block for the most recent matches —
+# a retry or a rerun with the same data skips all the formatting below.
+# We cache the string, never the block dict, so no caller can mutate a
+# cached value.
+@functools.lru_cache(maxsize=64)
+def _build_match_context(match_key: tuple) -> str:
+    """
+    Builds the match-specific prompt text from a key made by _match_key().
+
+    Raises:
+        KeyError: If a required match field is missing.
+    """
+    match = dict(match_key)
+
+    # --- Match Context ---
+    # We inject the actual match data here. Notice we're selective — we give
+    # Claude exactly what it needs to write good copy and nothing more.
+    # Giving it the entire raw API response would add noise and cost tokens.
+    # _MATCH_FIELDS pulls every field we need out of the dict in one call.
+    (sport, team, opponent, result, our_score, opp_score,
+     date, venue, league, is_home) = _MATCH_FIELDS(match)
+    location_context = "at home" if is_home else "on the road"
+
+    # Build a sport-specific detail line.
+    # For football we have goal scorer details if available.
+    # For basketball we have the point margin, which is more meaningful.
+    if sport == "football" and match.get("goal_details_home"):
+        home_goals = match["goal_details_home"] or "none"
+        away_goals = match["goal_details_away"] or "none"
+        extra_detail = (
+            f"Home goal details: {home_goals}. "
+            f"Away goal details: {away_goals}."
+        )
+    elif sport == "basketball":
+        margin = abs(our_score - opp_score)
+        extra_detail = f"Margin of victory/defeat: {margin} points."
+    else:
+        extra_detail = ""
+
+    # Anything that isn't WIN or LOSS is treated as a draw, as before.
+    tone_guidance = _TONE_GUIDANCE.get(result, _TONE_GUIDANCE["DRAW"])
+
+    # Fill in the match block in one pass over the precompiled template.
+    return _MATCH_CONTEXT_TEMPLATE.format(
+        team=team,
+        sport=sport,
+        league=league,
+        opponent=opponent,
+        result=result,
+        our_score=our_score,
+        opp_score=opp_score,
+        date=date,
+        venue=venue,
+        location_context=location_context,
+        extra_detail=extra_detail,
+        tone_guidance=tone_guidance,
+    )
 
 if __name__ == "__main__":
     # We import sports_fetcher here just for testing purposes.
     # In production, main.py orchestrates this — prompt_builder
     # never imports sports_fetcher directly.
-    from sports_fetcher import fetch_last_match
+    from sports_fetcher import fetch_matches
+
+    # Fetch both teams concurrently, then build each prompt.
+    matches = fetch_matches(["lakers", "manutd"])
 
-    for team_key in ["lakers", "manutd"]:
+    for team_key, match in matches.items():
         print(f"\n{'='*60}")
         print(f"PROMPT FOR: {team_key.upper()}")
         print('='*60)
-        match = fetch_last_match(team_key)
         prompt = build_prompt(match)
-        print(prompt)
-        print(f"\n📏 Prompt length: {len(prompt)} characters / ~{len(prompt)//4} tokens")
\ No newline at end of file
+        for block in prompt:
+            print(block["text"])
+            print()
+        prompt_length = sum(len(block["text"]) for block in prompt)
+        print(f"📏 Prompt length: {prompt_length} characters / ~{prompt_length//4} tokens "
+              f"({len(prompt[0]['text'])} characters cacheable)")
@@ -2,8 +2,19 @@
 # Responsibility: fetch and clean recent match data from TheSportsDB API.
 # This module knows nothing about AI or HTML — it only knows about sports data.
 
+import codecs  # standard library — provides the UTF-8 byte-order mark constant
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor  # standard library thread pool
 import requests  # third-party library for making HTTP requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry  # urllib3 is installed with requests
 import json
+from dotenv import load_dotenv
+
+# Load .env so SPORTS_CACHE_DISABLE (below) can be set there. main.py imports
+# this module before claude_client, so we can't rely on its load_dotenv().
+load_dotenv()
 
 # --- Team Configuration ---
 # These are TheSportsDB's permanent numeric IDs for our two target teams.
@@ -31,6 +42,57 @@ TEAM_CONFIG = {
 # publicly. A paid key would replace this with your personal key.
 BASE_URL = "https://www.thesportsdb.com/api/v1/json/123"
 
+# --- HTTP session ---
+# requests.get() creates a brand-new connection every time: DNS lookup,
+# TCP handshake, TLS handshake — often 100-300ms before a single byte of
+# data moves. A Session keeps connections open and reuses them, so every
+# request after the first skips that setup.
+#
+# The HTTPAdapter controls the connection pool (how many hosts to keep
+# pools for, and how many connections per host — enough for concurrent
+# fetches) and automatic retries: up to 2 retries, with a short growing
+# pause, when TheSportsDB answers with a temporary gateway/server error.
+# We deliberately ignore any Retry-After header on those responses: urllib3
+# would otherwise sleep for however long the server asks, with no upper
+# limit, so a "Retry-After: 600" could stall the fetch for many minutes.
+# Only the 0.3s backoff applies (the same reason claude_client caps its own
+# Retry-After waits).
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        respect_retry_after_header=False,
+    ),
+))
+
+# (connect, read) timeouts in seconds. Connecting should be near-instant,
+# so we give up on that quickly; the server then gets longer to respond.
+_TIMEOUT = (3.05, 10)
+
+# --- Match data cache ---
+# A team's "last match" only changes when they play again, so re-fetching
+# it on every run is wasted time. We keep each team's cleaned match data in
+# output/.cache/{team id}.json and reuse it for up to an hour.
+# Set SPORTS_CACHE_DISABLE=1 to always fetch fresh data (useful in testing).
+_CACHE_DIR = os.path.join(os.path.dirname(__file__), "output", ".cache")
+_CACHE_TTL = 3600  # seconds
+_CACHE_DISABLED = os.getenv("SPORTS_CACHE_DISABLE") == "1"
+
+# The fields a cache entry must have to be used — every key
+# _extract_match_data() returns. An entry missing any of them (hand-edited,
+# or written by an older version) is treated as a miss, so it can't crash
+# fetch_last_match() or prompt_builder further down the line.
+_MATCH_KEYS = frozenset({
+    "team_name", "sport", "league", "event_name", "date", "venue",
+    "home_team", "away_team", "home_score", "away_score", "our_score",
+    "opp_score", "opponent", "result", "is_home", "goal_details_home",
+    "goal_details_away", "status",
+})
+
 
 def fetch_last_match(team_key: str) -> dict:
     """
@@ -57,6 +119,15 @@ def fetch_last_match(team_key: str) -> dict:
 
     team = TEAM_CONFIG[team_key]
 
+    # Return the cached match data if we fetched it recently.
+    cache_path = os.path.join(_CACHE_DIR, f"{team['id']}.json")
+    if not _CACHE_DISABLED:
+        cached = _read_cache(cache_path)
+        if cached is not None:
+            print(f"🗄️  Using cached match data for {team['name']}: "
+                  f"{cached['event_name']} ({cached['date']})")
+            return cached
+
     # Step 2: Build the API URL.
     # f-strings let us inject variables into strings cleanly.
     # This produces something like:
@@ -66,12 +137,12 @@ def fetch_last_match(team_key: str) -> dict:
     print(f"📡 Fetching last match for {team['name']}...")
 
     # Step 3: Make the HTTP GET request.
-    # requests.get() sends a GET request to the URL and waits for a response.
-    # timeout=10 means: if the server doesn't respond within 10 seconds,
-    # stop waiting and raise an error. Without this, your script could hang
-    # forever if the API is down.
+    # _SESSION.get() sends a GET request to the URL over a pooled connection
+    # and waits for a response. The timeout means: if the server doesn't
+    # connect or respond in time, stop waiting and raise an error. Without
+    # this, your script could hang forever if the API is down.
     try:
-        response = requests.get(url, timeout=10)
+        response = _SESSION.get(url, timeout=_TIMEOUT)
 
         # raise_for_status() checks the HTTP status code.
         # A 200 code means success. 404 means not found. 500 means server error.
@@ -80,21 +151,32 @@ def fetch_last_match(team_key: str) -> dict:
         response.raise_for_status()
 
     except requests.exceptions.Timeout:
-        raise ConnectionError(f"Request to TheSportsDB timed out after 10 seconds.")
+        raise ConnectionError(
+            f"Request to TheSportsDB timed out "
+            f"(connect {_TIMEOUT[0]}s / read {_TIMEOUT[1]}s)."
+        )
     except requests.exceptions.RequestException as e:
         raise ConnectionError(f"Failed to fetch data from TheSportsDB: {e}")
 
     # Step 4: Parse the JSON response.
     # response.content gives us the raw bytes from the server.
-# Decoding with 'utf-8-sig' strips the BOM character if present,
-# then falls back to normal UTF-8 if there's no BOM — so this is
-# safe regardless of what the server sends.
-    data = json.loads(response.content.decode("utf-8-sig"))
+    # json.loads() accepts bytes directly (it detects UTF-8 itself), so
+    # we don't decode the whole payload into a string first. The one thing
+    # it won't accept is a leading UTF-8 byte-order mark, so we slice off
+    # those three bytes if the server ever sends them.
+    body = response.content
+    if body.startswith(codecs.BOM_UTF8):
+        body = body[len(codecs.BOM_UTF8):]
+    data = json.loads(body)
 
     # Step 5: Validate the response structure.
     # APIs can return empty results (e.g. if a team has no recent matches logged).
     # We check before trying to access data, which would throw a KeyError.
-    if not data.get("results"):
+    # We look "results" up once and keep it. `or ()` turns a missing key or
+    # "results": null into an empty tuple, so all three cases fail the same
+    # check below.
+    results = data.get("results") or ()
+    if not results:
         raise ValueError(
             f"No recent match data found for {team['name']}. "
             "TheSportsDB may not have updated results yet."
@@ -103,7 +185,7 @@ def fetch_last_match(team_key: str) -> dict:
     # Step 6: Extract only the most recent match.
     # results[0] is the most recent event in the list.
     # We store the raw dict in a variable so we can reference it cleanly below.
-    raw_match = data["results"][0]
+    raw_match = results[0]
 
     # Step 7: Clean and reshape the data.
     # This is a critical step called "data normalisation."
@@ -113,10 +195,109 @@ def fetch_last_match(team_key: str) -> dict:
     # The result is a clean contract between this module and the next one.
     cleaned = _extract_match_data(raw_match, team)
 
+    if not _CACHE_DISABLED:
+        _write_cache(cache_path, cleaned)
+
     print(f"✅ Match data fetched: {cleaned['event_name']} ({cleaned['date']})")
     return cleaned
 
 
+def fetch_matches(team_keys: list) -> dict:
+    """
+    Fetches the last match for several teams at once.
+
+    Each fetch spends nearly all its time waiting on the network, and
+    Python releases the GIL while a thread waits on a socket — so running
+    the fetches in a thread pool overlaps those waits. Two teams take about
+    as long as one; more teams scale the same way.
+
+    Args:
+        team_keys: Keys from TEAM_CONFIG, e.g. ["lakers", "manutd"]
+
+    Returns:
+        A dictionary mapping each team key to its cleaned match data,
+        in the same order as team_keys.
+
+    Raises:
+        ValueError / ConnectionError: As fetch_last_match(). If several
+        fetches fail, the first failure (in team_keys order) is raised.
+    """
+    if not team_keys:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=len(team_keys)) as executor:
+        # executor.map() runs fetch_last_match on each key concurrently
+        # and yields the results in input order.
+        matches = list(executor.map(fetch_last_match, team_keys))
+
+    return dict(zip(team_keys, matches))
+
+
+def _read_cache(path: str):
+    """
+    Returns cached match data from path, or None if it's missing, older
+    than _CACHE_TTL, unreadable, or not a match dict with every field in
+    _MATCH_KEYS. The cache is only a shortcut — any problem with it just
+    means we fetch from the API as normal.
+    """
+    try:
+        if time.time() - os.path.getmtime(path) >= _CACHE_TTL:
+            return None
+        with open(path, "rb") as f:
+            match = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(match, dict) or not match.keys() >= _MATCH_KEYS:
+        return None
+    return match
+
+
+def _write_cache(path: str, match: dict) -> None:
+    """
+    Saves cleaned match data to the cache.
+
+    We write to a temporary file and os.replace() it into place, so a
+    concurrent reader never picks up a half-written cache entry.
+    """
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(match, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️  Could not write match data cache: {e}")
+
+
+def _as_int(value) -> int:
+    """
+    Converts a score from the API to an int, or 0 if there isn't one.
+
+    The API sometimes returns "2", sometimes 2, sometimes None (or "" for
+    a match that hasn't been played). The usual shape — a plain digit
+    string — is checked up front and converted directly, which skips the
+    try/except setup. Everything else (ints, floats like 2.0, "+3",
+    " 4 ", junk) goes through int() itself, so the result is the same
+    as a plain int() call would give.
+    """
+    if isinstance(value, str) and value.isdecimal():
+        return int(value)
+    if value is None:
+        return 0
+    try:
+        return int(value)
+    except (ValueError, TypeError, OverflowError):
+        # OverflowError: int(float("inf")).
+        return 0
+
+
+# The result of a match, keyed by the sign of (our score - their score).
+# (a > b) - (a < b) is 1 when a is bigger, -1 when b is, and 0 for a tie —
+# True and False count as 1 and 0 — so one lookup replaces an if/elif/else.
+_RESULT = {1: "WIN", 0: "DRAW", -1: "LOSS"}
+
+
 def _extract_match_data(raw: dict, team: dict) -> dict:
     """
     Extracts and normalises fields from a raw TheSportsDB event object.
@@ -133,40 +314,23 @@ def _extract_match_data(raw: dict, team: dict) -> dict:
         A clean, normalised dictionary with only the fields we need.
     """
 
-    # Safe integer conversion helper.
-    # The API sometimes returns "2", sometimes 2, sometimes None.
-    # This function handles all three cases consistently.
-    def safe_int(value):
-        try:
-            return int(value) if value is not None else 0
-        except (ValueError, TypeError):
-            return 0
+    # g is raw.get, looked up once and reused for every field below.
+    g = raw.get
 
     # Determine if our team was playing at home or away.
     # This affects how we frame the narrative ("at Old Trafford" vs "on the road").
-    home_team = raw.get("strHomeTeam", "")
-    away_team = raw.get("strAwayTeam", "")
+    home_team = g("strHomeTeam", "")
+    away_team = g("strAwayTeam", "")
     is_home = team["api_name"].lower() == home_team.lower()
 
-    home_score = safe_int(raw.get("intHomeScore"))
-    away_score = safe_int(raw.get("intAwayScore"))
+    home_score = _as_int(g("intHomeScore"))
+    away_score = _as_int(g("intAwayScore"))
 
     # Determine the result from our team's perspective.
-    if is_home:
-        our_score = home_score
-        opp_score = away_score
-        opponent = away_team
-    else:
-        our_score = away_score
-        opp_score = home_score
-        opponent = home_team
-
-    if our_score > opp_score:
-        result = "WIN"
-    elif our_score < opp_score:
-        result = "LOSS"
-    else:
-        result = "DRAW"
+    our_score, opp_score, opponent = (
+        (home_score, away_score, away_team) if is_home
+        else (away_score, home_score, home_team)
+    )
 
     # Build the clean dictionary.
     # Every key here is something the prompt builder will reference by name.
@@ -175,9 +339,9 @@ def _extract_match_data(raw: dict, team: dict) -> dict:
         "team_name": team["name"],
         "sport": team["sport"],
         "league": team["league"],
-        "event_name": raw.get("strEvent", "Unknown Match"),
-        "date": raw.get("dateEvent", "Unknown Date"),
-        "venue": raw.get("strVenue", "Unknown Venue"),
+        "event_name": g("strEvent", "Unknown Match"),
+        "date": g("dateEvent", "Unknown Date"),
+        "venue": g("strVenue", "Unknown Venue"),
         "home_team": home_team,
         "away_team": away_team,
         "home_score": home_score,
@@ -185,13 +349,14 @@ def _extract_match_data(raw: dict, team: dict) -> dict:
         "our_score": our_score,
         "opp_score": opp_score,
         "opponent": opponent,
-        "result": result,
+        # See _RESULT: the comparison gives 1, 0 or -1.
+        "result": _RESULT[(our_score > opp_score) - (our_score < opp_score)],
         "is_home": is_home,
         # Goal details are football-specific. For basketball these will be None.
         # The prompt builder will handle this gracefully.
-        "goal_details_home": raw.get("strHomeGoalDetails") or None,
-        "goal_details_away": raw.get("strAwayGoalDetails") or None,
-        "status": raw.get("strStatus", "Unknown"),
+        "goal_details_home": g("strHomeGoalDetails") or None,
+        "goal_details_away": g("strAwayGoalDetails") or None,
+        "status": g("strStatus", "Unknown"),
     }
 
 
@@ -201,9 +366,10 @@ def _extract_match_data(raw: dict, team: dict) -> dict:
 if __name__ == "__main__":
     import json  # standard library for pretty-printing JSON
 
-    for team_key in ["manutd", "lakers"]:
+    matches = fetch_matches(["manutd", "lakers"])
+
+    for team_key, match in matches.items():
         print(f"\n{'='*50}")
-        match = fetch_last_match(team_key)
         # json.dumps with indent=2 pretty-prints the dictionary so it's
         # readable in the terminal rather than one long line.
         print(json.dumps(match, indent=2))
\ No newline at end of file
@@ -4,12 +4,58 @@
 # This module is the quality gate between the AI layer and the output layer.
 
 import json
-import re
 import os
-from datetime import datetime
 
-
-def parse_and_save(raw_response: str, team_key: str) -> dict:
+from output_names import new_output_stem
+
+# Where story JSON files are written: output/ next to this file.
+# os.path.abspath(__file__) gives us this script's full path, and
+# os.path.dirname() the directory it lives in. os.path.join() builds a path
+# safely regardless of OS (handles / vs \).
+# We resolve the path and create the directory once, at import time, rather
+# than on every save. exist_ok=True means don't raise an error if it already
+# exists — the opposite of the default behaviour.
+_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
+os.makedirs(_OUTPUT_DIR, exist_ok=True)
+
+# A reusable decoder for _extract_json(). Its raw_decode() method can parse
+# a JSON object that starts part-way into a string, which the plain
+# json.loads() (and orjson) can't.
+_DECODER = json.JSONDecoder()
+
+# orjson is an optional, faster drop-in for json.dumps(). If it's installed
+# we serialise with it; otherwise we fall back to the standard library.
+try:
+    import orjson
+
+    def _dumps_pretty(story: dict) -> bytes:
+        """Serialises a story as indented UTF-8 JSON bytes."""
+        # orjson always writes non-ASCII characters (like emoji) as-is.
+        return orjson.dumps(story, option=orjson.OPT_INDENT_2)
+
+except ImportError:
+    def _dumps_pretty(story: dict) -> bytes:
+        """Serialises a story as indented UTF-8 JSON bytes."""
+        # indent=2 makes the file human-readable (pretty-printed).
+        # ensure_ascii=False preserves emoji and non-ASCII characters —
+        # important since our CTA slides often contain emoji.
+        return json.dumps(story, indent=2, ensure_ascii=False).encode("utf-8")
+
+# --- Story schema ---
+# The fields every story needs, and the fields each slide type needs.
+# These are the fields our HTML renderer will reference by name.
+# Tuples rather than lists: they never change, and they're defined once
+# here instead of being rebuilt on every validation.
+_REQUIRED_TOP = ("team", "match", "date", "result", "slides")
+_REQUIRED_TOP_SET = frozenset(_REQUIRED_TOP)
+_REQUIRED_SLIDE = {
+    "headline": ("type", "text", "subtext"),
+    "stat":     ("type", "stat_label", "stat_value", "narrative"),
+    "cta":      ("type", "text", "subtext"),
+}
+
+
+def parse_and_save(raw_response: str, team_key: str, stem: str = None) -> dict:
     """
     Parses Claude's raw text response into a validated Story dictionary
     and saves it as a JSON file in the output/ directory.
@@ -17,6 +63,11 @@ def parse_and_save(raw_response: str, team_key: str) -> dict:
     Args:
         raw_response: The raw string returned by claude_client.generate_story()
         team_key:     "lakers" or "manutd" — used to name the output file
+        stem:         Optional filename (without extension) from
+                      output_names.new_output_stem(). main.py passes the
+                      same stem to html_renderer.render_html(), so a story's
+                      .json and .html files share a name. A new one is made
+                      if omitted.
 
     Returns:
         The validated Story dictionary.
@@ -26,78 +77,59 @@ def parse_and_save(raw_response: str, team_key: str) -> dict:
         IOError:    If the output file can't be written.
     """
 
-    # Step 1: Clean the raw response.
-    # This handles the edge cases described above — markdown fences,
-    # preamble text, and whitespace — before we try to parse.
-    cleaned = _clean_response(raw_response)
-
-    # Step 2: Parse the cleaned string into a Python dictionary.
-    story = _parse_json(cleaned)
+    # Step 1: Find and parse the JSON object in the raw response.
+    # This handles the edge cases described in _extract_json() — markdown
+    # fences, preamble text, and whitespace — in a single pass.
+    story = _extract_json(raw_response)
 
-    # Step 3: Validate the dictionary has the structure we expect.
+    # Step 2: Validate the dictionary has the structure we expect.
     # This catches schema drift — e.g. missing fields or wrong slide count.
     _validate_schema(story)
 
-    # Step 4: Write the validated dictionary to a JSON file.
-    output_path = _write_json(story, team_key)
+    # Step 3: Write the validated dictionary to a JSON file.
+    output_path = _write_json(story, stem or new_output_stem(team_key))
 
     print(f"💾 Story saved to: {output_path}")
     return story
 
 
-def _clean_response(raw: str) -> str:
+def _extract_json(raw: str) -> dict:
     """
-    Removes common Claude response artifacts that would break JSON parsing.
+    Finds the JSON object in Claude's raw response and parses it into a
+    Python dictionary, ignoring common artifacts around it.
 
     This function is defensive — it assumes the response *might* have issues
-    and strips them safely. If the response is already clean, nothing changes.
+    (preamble, markdown fences, trailing chatter) and skips past them safely.
+    Provides a clear error message if parsing fails.
     """
 
-    # Strip leading and trailing whitespace first.
-    cleaned = raw.strip()
-
-    # Remove markdown code fences if present.
-    # re.sub() is Python's regex substitution function.
-    # The pattern r'```(?:json)?\s*' matches either:
-    #   ```json    (with the word json)
-    #   ```        (without it)
-    # followed by optional whitespace. The re.DOTALL flag makes . match
-    # newlines too. We replace both the opening and closing fences with "".
-    cleaned = re.sub(r'```(?:json)?\s*', '', cleaned)
-    cleaned = re.sub(r'```\s*$', '', cleaned, flags=re.MULTILINE)
-
-    # If there's any text before the first {, strip it.
-    # This handles preamble like "Here is the JSON: { ... }"
+    # Find where the JSON object starts.
+    # Skipping to the first { handles preamble like "Here is the JSON: { ... }"
+    # and an opening markdown fence (```json), which always sits before it.
     # str.find() returns the index of the first occurrence, or -1 if not found.
-    brace_start = cleaned.find('{')
-    brace_end = cleaned.rfind('}')  # rfind finds the LAST occurrence
+    brace_start = raw.find('{')
 
-    if brace_start == -1 or brace_end == -1:
+    if brace_start == -1:
         raise ValueError(
             "No JSON object found in Claude's response. "
             f"Raw response was:\n{raw[:200]}..."
         )
 
-    # Slice out just the JSON object, discarding anything before { or after }
-    cleaned = cleaned[brace_start:brace_end + 1]
-
-    return cleaned.strip()
-
-
-def _parse_json(cleaned: str) -> dict:
-    """
-    Parses a cleaned JSON string into a Python dictionary.
-    Provides a clear error message if parsing still fails after cleaning.
-    """
+    # raw_decode() parses one complete JSON value starting at brace_start
+    # and stops as soon as it ends, returning (value, end_index). Anything
+    # after the closing } — a closing fence, a sign-off — is simply ignored,
+    # so we don't need to search for the last } or slice out a copy first.
     try:
-        return json.loads(cleaned)
+        story, _ = _DECODER.raw_decode(raw, brace_start)
     except json.JSONDecodeError as e:
         raise ValueError(
             f"Failed to parse Claude's response as JSON.\n"
             f"Parse error: {e}\n"
-            f"Cleaned response was:\n{cleaned[:300]}..."
+            f"Response from first {{ was:\n{raw[brace_start:brace_start + 300]}..."
         )
 
+    return story
+
 
 def _validate_schema(story: dict) -> None:
     """
@@ -114,14 +146,14 @@ def _validate_schema(story: dict) -> None:
     """
 
     # Check required top-level fields.
-    # These are the fields our HTML renderer will reference by name.
-    required_top_level = ["team", "match", "date", "result", "slides"]
-    for field in required_top_level:
-        if field not in story:
-            raise ValueError(
-                f"Story is missing required top-level field: '{field}'. "
-                f"Keys present: {list(story.keys())}"
-            )
+    # A single subset test covers the common all-present case; only if it
+    # fails do we walk the fields to name the first missing one.
+    if not story.keys() >= _REQUIRED_TOP_SET:
+        missing = next(field for field in _REQUIRED_TOP if field not in story)
+        raise ValueError(
+            f"Story is missing required top-level field: '{missing}'. "
+            f"Keys present: {list(story.keys())}"
+        )
 
     # Check slides is a list.
     if not isinstance(story["slides"], list):
@@ -137,24 +169,23 @@ def _validate_schema(story: dict) -> None:
     if slide_count != 4:
         print(f"⚠️  Warning: expected 4 slides, got {slide_count}. Continuing.")
 
-    # Define required fields per slide type.
-    # Each slide type has a different shape, so we validate each separately.
-    required_fields = {
-        "headline": ["type", "text", "subtext"],
-        "stat":     ["type", "stat_label", "stat_value", "narrative"],
-        "cta":      ["type", "text", "subtext"]
-    }
-
+    # Each slide type has a different shape, so we validate each against
+    # its own entry in _REQUIRED_SLIDE.
     for i, slide in enumerate(story["slides"]):
+        if not isinstance(slide, dict):
+            raise ValueError(
+                f"Slide {i+1} should be an object, got {type(slide).__name__}"
+            )
+
         slide_type = slide.get("type")
 
-        if slide_type not in required_fields:
+        if slide_type not in _REQUIRED_SLIDE:
             raise ValueError(
                 f"Slide {i+1} has unknown type: '{slide_type}'. "
-                f"Expected one of: {list(required_fields.keys())}"
+                f"Expected one of: {list(_REQUIRED_SLIDE.keys())}"
             )
 
-        for field in required_fields[slide_type]:
+        for field in _REQUIRED_SLIDE[slide_type]:
             if field not in slide:
                 raise ValueError(
                     f"Slide {i+1} (type: '{slide_type}') is missing "
@@ -167,40 +198,39 @@ def _validate_schema(story: dict) -> None:
           f"types: {[s['type'] for s in story['slides']]}")
 
 
-def _write_json(story: dict, team_key: str) -> str:
+def _write_json(story: dict, stem: str) -> str:
     """
-    Writes the validated Story dictionary to a JSON file in output/.
+    Writes the validated Story dictionary to output/{stem}.json.
 
-    The filename includes a timestamp so repeated runs don't overwrite
-    each other — useful when you want to compare outputs across sessions.
+    The stem (see new_output_stem()) includes a timestamp so repeated runs
+    don't overwrite each other — useful when you want to compare outputs
+    across sessions.
 
     Returns the full path of the written file.
     """
-
-    # Build the output directory path relative to this file's location.
-    # os.path.dirname(__file__) gives us the directory this script lives in.
-    # os.path.join() builds a path safely regardless of OS (handles / vs \).
-    output_dir = os.path.join(os.path.dirname(__file__), "output")
-
-    # Create the directory if it doesn't exist.
-    # exist_ok=True means don't raise an error if it already exists —
-    # the opposite of the default behaviour.
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Build a timestamped filename.
-    # strftime formats a datetime object as a string.
-    # "%Y%m%d_%H%M%S" produces something like "20260213_143022".
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{team_key}_story_{timestamp}.json"
-    output_path = os.path.join(output_dir, filename)
+    output_path = os.path.join(_OUTPUT_DIR, f"{stem}.json")
 
     # Write the dictionary as formatted JSON.
-    # indent=2 makes the file human-readable (pretty-printed).
-    # ensure_ascii=False preserves emoji and non-ASCII characters —
-    # important since our CTA slides often contain emoji.
+    # _dumps_pretty() gives us the finished file contents as UTF-8 bytes,
+    # so we hand them straight to the OS: os.open() returns a raw file
+    # descriptor and os.write() writes the whole buffer, normally in a
+    # single system call, with no Python file object in between.
+    # os.write() may write fewer bytes than asked, so we loop until the
+    # buffer is empty. O_BINARY only exists (and matters) on Windows.
+    #
+    # As in html_renderer, we write to a temporary file and os.replace()
+    # it into place, so a reader never sees a partially written story.
+    data = memoryview(_dumps_pretty(story))
+    tmp_path = output_path + ".tmp"
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(story, f, indent=2, ensure_ascii=False)
+        fd = os.open(tmp_path, flags, 0o644)
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, output_path)
     except IOError as e:
         raise IOError(f"Failed to write output file: {e}")
 
@@ -208,24 +238,36 @@ def _write_json(story: dict, team_key: str) -> str:
 
 
 if __name__ == "__main__":
+    import asyncio
+
     from sports_fetcher import fetch_last_match
     from prompt_builder import build_prompt
-    from claude_client import generate_story
+    from claude_client import generate_story_async
 
-    for team_key in ["lakers", "manutd"]:
+    async def run_team(team_key: str) -> dict:
+        """Fetch -> prompt -> Claude -> parse for one team, without blocking."""
+        match = await asyncio.to_thread(fetch_last_match, team_key)
+        prompt = build_prompt(match)
+        raw_response = await generate_story_async(prompt, team_key)
+        return await asyncio.to_thread(parse_and_save, raw_response, team_key)
+
+    async def run_all(team_keys: list) -> list:
+        # Each team's whole pipeline runs concurrently, so one team's
+        # network and Claude waits overlap with the other's.
+        return await asyncio.gather(*(run_team(k) for k in team_keys))
+
+    team_keys = ["lakers", "manutd"]
+    stories = asyncio.run(run_all(team_keys))
+
+    for team_key, story in zip(team_keys, stories):
         print(f"\n{'='*60}")
-        print(f"PARSING STORY FOR: {team_key.upper()}")
+        print(f"STORY FOR: {team_key.upper()}")
         print('='*60)
 
-        match = fetch_last_match(team_key)
-        prompt = build_prompt(match)
-        raw_response = generate_story(prompt)
-        story = parse_and_save(raw_response, team_key)
-
         # Print a summary of what was saved rather than the whole thing —
         # we've already seen the full JSON in Stage 4.
         print(f"\n📋 Story summary:")
         print(f"   Team:   {story['team']}")
         print(f"   Match:  {story['match']}")
         print(f"   Result: {story['result']}")
-        print(f"   Slides: {[s['type'] for s in story['slides']]}")
\ No newline at end of file
+        print(f"   Slides: {[s['type'] for s in story['slides']]}")